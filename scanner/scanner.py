@@ -2,75 +2,234 @@
 
 import ssl
 import socket
+import selectors
+import errno
 import json
 import sys
 import requests
+from requests.adapters import HTTPAdapter
 import subprocess
+import shutil
+import threading
 import argparse
+import time
 from urllib.parse import urlparse
 from datetime import datetime
+from collections import OrderedDict
 import concurrent.futures
 import warnings
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Suppress SSL warnings for testing
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
+# connect() errors meaning the address itself cannot be reached
+_UNREACHABLE_ERRNOS = frozenset({
+    errno.ENETUNREACH,
+    errno.EHOSTUNREACH,
+    errno.EADDRNOTAVAIL,
+    errno.EAFNOSUPPORT
+})
+
+# Recommendations for missing headers, in the order they are reported
+_HEADER_RECS = {
+    'content-security-policy': 'Add Content-Security-Policy header to prevent XSS attacks',
+    'x-frame-options': 'Enable X-Frame-Options to prevent clickjacking',
+    'strict-transport-security': 'Add Strict-Transport-Security header for HTTPS enforcement'
+}
+
+def _json_default(obj):
+    """Serialize header sets as sorted lists, anything else as a string"""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    return str(obj)
+
+def _dump_json(results):
+    """Serialize results as indented JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(results, option=orjson.OPT_INDENT_2, default=_json_default)
+    return json.dumps(results, indent=2, default=_json_default).encode()
+
+class PeerCertAdapter(HTTPAdapter):
+    """HTTPAdapter that records the TLS peer certificate on each response"""
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        response.peer_cert = None
+        
+        # The body is not consumed yet, so the connection is still attached
+        conn = getattr(resp, '_connection', None)
+        sock = getattr(conn, 'sock', None)
+        if sock is not None and hasattr(sock, 'getpeercert'):
+            # Unverified (verify=False) connections return {}; treat that as
+            # no certificate so the SSL check does its own handshake
+            response.peer_cert = sock.getpeercert() or None
+        
+        return response
+
 class VulnerabilityScanner:
+    # Seconds to reuse SSL results; failures are retried sooner
+    SSL_CACHE_TTL = 300
+    SSL_NEGATIVE_CACHE_TTL = 120
+    SSL_CACHE_SIZE = 256
+
+    # Seconds nmap may run, and how long to wait for it once our own probes finish
+    NMAP_TIMEOUT = 15
+    NMAP_GRACE = 5
+
     def __init__(self):
-        self.security_headers = [
+        self.security_headers = frozenset({
             'strict-transport-security',
-            'content-security-policy', 
+            'content-security-policy',
             'x-frame-options',
             'x-content-type-options',
             'x-xss-protection',
             'referrer-policy'
-        ]
+        })
         self.common_ports = [80, 443, 8080, 8443, 3000, 3001, 22, 21, 25, 53, 110, 993, 995]
 
-    def check_ssl_certificate(self, hostname, port=443):
-        """Check SSL certificate validity and expiration"""
+        # Reuse connections across requests (HTTP keep-alive)
+        self.session = requests.Session()
+        adapter = PeerCertAdapter(pool_connections=32, pool_maxsize=32, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.nmap_path = shutil.which('nmap')
+
+        # (hostname, port) -> (timestamp, result), least recently used first
+        self._ssl_cache = OrderedDict()
+        self._ssl_cache_lock = threading.Lock()
+
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+
+    def _days_remaining(self, not_after):
+        """Days until the given certificate notAfter date"""
+        # notAfter is in GMT; compare epoch seconds rather than naive local time
+        expiry = ssl.cert_time_to_seconds(not_after)
+        return int((expiry - time.time()) // 86400)
+
+    def check_ssl_certificate(self, hostname, port=443, ip=None):
+        """Check SSL certificate validity and expiration (cached per host)"""
+        key = (hostname, port)
+        now = time.time()
+        with self._ssl_cache_lock:
+            cached = self._ssl_cache.get(key)
+            if cached:
+                self._ssl_cache.move_to_end(key)
+        
+        if cached:
+            timestamp, result = cached
+            ttl = self.SSL_CACHE_TTL if result['valid'] else self.SSL_NEGATIVE_CACHE_TTL
+            if now - timestamp < ttl:
+                result = dict(result)
+                if result['valid']:
+                    # Expiry is the only time-dependent field
+                    result['days_remaining'] = self._days_remaining(result['expires'])
+                return result
+        
+        result = self._fetch_ssl_certificate(hostname, port, ip)
+        self._cache_ssl_result(key, now, result)
+        return dict(result)
+
+    def _cache_ssl_result(self, key, timestamp, result):
+        """Store an SSL result, evicting the least recently used entries"""
+        with self._ssl_cache_lock:
+            self._ssl_cache[key] = (timestamp, result)
+            self._ssl_cache.move_to_end(key)
+            while len(self._ssl_cache) > self.SSL_CACHE_SIZE:
+                self._ssl_cache.popitem(last=False)
+
+    def _fetch_ssl_certificate(self, hostname, port, ip=None):
+        """Perform the TLS handshake and parse the peer certificate"""
         try:
             context = ssl.create_default_context()
             context.check_hostname = False
             context.verify_mode = ssl.CERT_NONE
             
-            with socket.create_connection((hostname, port), timeout=10) as sock:
+            # Connect to the resolved address but keep the hostname for SNI
+            with self._connect(hostname, port, ip, timeout=10) as sock:
                 with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    cert = ssock.getpeercert()
-                    
-                    # Parse expiration date
-                    expiry_date = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
-                    days_remaining = (expiry_date - datetime.now()).days
-                    
-                    return {
-                        'valid': True,
-                        'days_remaining': days_remaining,
-                        'issuer': cert.get('issuer', [{}])[0].get('commonName', 'Unknown'),
-                        'expires': cert['notAfter'],
-                        'subject': cert.get('subject', [{}])[0].get('commonName', 'Unknown')
-                    }
+                    return self._certificate_result(ssock.getpeercert())
                     
         except Exception as e:
-            return {
-                'valid': False,
-                'error': str(e),
-                'days_remaining': 0
-            }
+            return self._certificate_error(e)
+
+    def _connect(self, hostname, port, ip=None, timeout=10):
+        """Connect to ip, trying hostname's other addresses only if it is unreachable"""
+        if not ip:
+            return socket.create_connection((hostname, port), timeout=timeout)
+        
+        error = None
+        for _, sockaddr in self._candidate_addresses(hostname, ip):
+            try:
+                return socket.create_connection((sockaddr[0], port), timeout=timeout)
+            except OSError as e:
+                # Refused or timed out means the host answered (or is filtered)
+                if e.errno not in _UNREACHABLE_ERRNOS:
+                    raise
+                error = e
+        raise error or OSError(f'No address to connect to for {hostname}')
+
+    def _certificate_result(self, cert):
+        """Build the SSL result from a parsed peer certificate"""
+        return {
+            'valid': True,
+            'days_remaining': self._days_remaining(cert['notAfter']),
+            'issuer': cert.get('issuer', [{}])[0].get('commonName', 'Unknown'),
+            'expires': cert['notAfter'],
+            'subject': cert.get('subject', [{}])[0].get('commonName', 'Unknown')
+        }
+
+    def _certificate_error(self, error):
+        """Build the SSL result for a failed certificate check"""
+        return {
+            'valid': False,
+            'error': str(error),
+            'days_remaining': 0
+        }
+
+    def _remember_peer_certs(self, response):
+        """Seed the SSL cache from certificates seen while fetching headers"""
+        now = time.time()
+        for r in response.history + [response]:
+            cert = getattr(r, 'peer_cert', None)
+            parsed = urlparse(r.url)
+            if cert is None or parsed.scheme != 'https':
+                continue
+            
+            try:
+                result = self._certificate_result(cert)
+            except Exception as e:
+                result = self._certificate_error(e)
+            self._cache_ssl_result((parsed.hostname, parsed.port or 443), now, result)
 
     def check_security_headers(self, url):
         """Check for security headers"""
         try:
-            response = requests.head(url, timeout=10, verify=False, allow_redirects=True)
-            headers = {k.lower(): v for k, v in response.headers.items()}
-            
-            present = []
-            missing = []
-            
-            for header in self.security_headers:
-                if header in headers:
-                    present.append(header)
+            response = self.session.head(url, timeout=10, verify=False, allow_redirects=True)
+            if response.status_code >= 400:
+                # Some servers reject HEAD; fetch a single byte instead
+                response = self.session.get(
+                    url,
+                    headers={'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'},
+                    stream=True, timeout=10, verify=False, allow_redirects=True
+                )
+                if response.status_code == 206:
+                    # Reading the one-byte body returns the connection to the pool
+                    response.content
                 else:
-                    missing.append(header)
+                    # Range was ignored; don't download a full body
+                    response.close()
+            self._remember_peer_certs(response)
+            # response.headers is a CaseInsensitiveDict, so no lowercase copy
+            present = frozenset(h for h in self.security_headers if h in response.headers)
+            missing = self.security_headers - present
             
             score = round((len(present) / len(self.security_headers)) * 100)
             
@@ -84,57 +243,170 @@ class VulnerabilityScanner:
         except Exception as e:
             return {
                 'missing': self.security_headers,
-                'present': [],
+                'present': frozenset(),
                 'score': 0,
                 'error': str(e)
             }
 
-    def scan_port(self, hostname, port, timeout=3):
-        """Scan a single port"""
-        try:
-            with socket.create_connection((hostname, port), timeout=timeout):
-                return True
-        except:
-            return False
+    def _candidate_addresses(self, hostname, ip=None):
+        """Yield (family, sockaddr) for ip first, then hostname's other addresses"""
+        tried = set()
+        for host in (ip, hostname) if ip else (hostname,):
+            try:
+                # A numeric ip is returned as-is without a DNS lookup
+                infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            except (OSError, UnicodeError):
+                continue
+            
+            for family, _, _, _, sockaddr in infos:
+                if sockaddr[0] not in tried:
+                    tried.add(sockaddr[0])
+                    yield family, sockaddr
 
-    def scan_ports(self, hostname):
-        """Scan common ports using threading"""
+    def _scan_address(self, family, sockaddr, timeout):
+        """Scan common ports on one address; returns (open ports, reachable)"""
         open_ports = []
-        closed_ports = []
+        unreachable = False
+        selector = selectors.DefaultSelector()
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-            futures = {
-                executor.submit(self.scan_port, hostname, port): port 
-                for port in self.common_ports
-            }
-            
-            for future in concurrent.futures.as_completed(futures):
-                port = futures[future]
+        try:
+            # Issue every connect() at once and collect them as they complete
+            for port in self.common_ports:
                 try:
-                    if future.result():
-                        open_ports.append(port)
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                except OSError:
+                    return [], False
+                sock.setblocking(False)
+                err = sock.connect_ex((sockaddr[0], port) + tuple(sockaddr[2:]))
+                if err == 0:
+                    open_ports.append(port)
+                    sock.close()
+                elif err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    selector.register(sock, selectors.EVENT_WRITE, port)
+                else:
+                    unreachable = unreachable or err in _UNREACHABLE_ERRNOS
+                    sock.close()
+            
+            deadline = time.monotonic() + timeout
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                for key, _ in selector.select(timeout=remaining):
+                    sock = key.fileobj
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if err == 0:
+                        open_ports.append(key.data)
                     else:
-                        closed_ports.append(port)
-                except:
-                    closed_ports.append(port)
+                        unreachable = unreachable or err in _UNREACHABLE_ERRNOS
+                    selector.unregister(sock)
+                    sock.close()
+        finally:
+            # Anything still pending at the deadline is treated as closed
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+        
+        return open_ports, bool(open_ports) or not unreachable
+
+    def scan_ports(self, hostname, timeout=3, ip=None):
+        """Scan common ports with non-blocking connects on a single selector
+
+        The pinned ip is tried first; other addresses of hostname are only
+        scanned if it turns out to be unreachable.
+        """
+        open_ports = []
+        for family, sockaddr in self._candidate_addresses(hostname, ip):
+            open_ports, reachable = self._scan_address(family, sockaddr, timeout)
+            if reachable:
+                break
         
         return {
             'open': sorted(open_ports),
-            'closed': sorted(closed_ports),
+            'closed': sorted(p for p in self.common_ports if p not in open_ports),
             'total': len(self.common_ports)
         }
 
-    def nmap_scan(self, hostname):
-        """Run basic nmap scan if available"""
+    def _parse_nmap_greppable(self, lines):
+        """Extract open ports and the OS guess from nmap -oG output"""
+        open_ports = []
+        os_guess = None
+        
+        for line in lines:
+            if line.startswith('#'):
+                continue
+            
+            for field in line.rstrip('\n').split('\t'):
+                name, _, value = field.partition(': ')
+                if name == 'Ports':
+                    # e.g. 22/open/tcp//ssh//OpenSSH 8.9/
+                    for entry in value.split(', '):
+                        parts = entry.split('/')
+                        if len(parts) >= 5 and parts[1] == 'open':
+                            open_ports.append({
+                                'port': int(parts[0]),
+                                'protocol': parts[2],
+                                'service': parts[4]
+                            })
+                elif name == 'OS':
+                    os_guess = value
+        
+        return open_ports, os_guess
+
+    def nmap_scan(self, hostname, os_detection=False, timeout=NMAP_TIMEOUT, ip=None,
+                  on_start=None):
+        """Run basic nmap scan if available
+
+        on_start, if given, is called with the nmap process so the caller
+        can kill it early.
+        """
+        if self.nmap_path is None:
+            return {
+                'available': False,
+                'error': 'Nmap not installed'
+            }
+        
+        target = ip or hostname
+        command = [self.nmap_path, '-sS', '--top-ports', '100', '-oG', '-', target]
+        if os_detection:
+            command.insert(2, '-O')
+        if ':' in target:
+            # nmap only accepts IPv6 targets in -6 mode
+            command.insert(1, '-6')
+        
         try:
-            result = subprocess.run([
-                'nmap', '-sS', '-O', '--top-ports', '100', hostname
-            ], capture_output=True, text=True, timeout=30)
+            # Stream the greppable output instead of buffering the raw text
+            proc = subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
+            if on_start is not None:
+                on_start(proc)
+            timed_out = threading.Event()
+            
+            def kill():
+                timed_out.set()
+                proc.kill()
+            
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            try:
+                open_ports, os_guess = self._parse_nmap_greppable(proc.stdout)
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+                proc.stdout.close()
             
-            if result.returncode == 0:
+            if timed_out.is_set():
+                return {
+                    'available': False,
+                    'error': 'Nmap scan timeout'
+                }
+            elif returncode == 0:
                 return {
                     'available': True,
-                    'output': result.stdout,
+                    'open_ports': open_ports,
+                    'os': os_guess,
                     'summary': 'Nmap scan completed successfully'
                 }
             else:
@@ -147,11 +419,6 @@ class VulnerabilityScanner:
                 'available': False,
                 'error': 'Nmap not installed'
             }
-        except subprocess.TimeoutExpired:
-            return {
-                'available': False,
-                'error': 'Nmap scan timeout'
-            }
         except Exception as e:
             return {
                 'available': False,
@@ -179,13 +446,10 @@ class VulnerabilityScanner:
         headers_score = headers_info.get('score', 0)
         score += round((headers_score / 100) * 40)
         
-        missing_headers = headers_info.get('missing', [])
-        if 'content-security-policy' in missing_headers:
-            recommendations.append('Add Content-Security-Policy header to prevent XSS attacks')
-        if 'x-frame-options' in missing_headers:
-            recommendations.append('Enable X-Frame-Options to prevent clickjacking')
-        if 'strict-transport-security' in missing_headers:
-            recommendations.append('Add Strict-Transport-Security header for HTTPS enforcement')
+        missing_headers = set(headers_info.get('missing', ()))
+        for header, recommendation in _HEADER_RECS.items():
+            if header in missing_headers:
+                recommendations.append(recommendation)
         
         # Ports scoring (20% of total)
         open_ports = ports_info.get('open', [])
@@ -194,11 +458,13 @@ class VulnerabilityScanner:
         
         if not unexpected_open:
             score += 20
-        elif len(unexpected_open) <= 2:
-            score += 10
-            recommendations.append(f'Consider closing unnecessary ports: {", ".join(map(str, unexpected_open))}')
         else:
-            recommendations.append(f'Multiple unnecessary ports open: {", ".join(map(str, unexpected_open))} - security risk')
+            port_list = ', '.join(map(str, unexpected_open))
+            if len(unexpected_open) <= 2:
+                score += 10
+                recommendations.append(f'Consider closing unnecessary ports: {port_list}')
+            else:
+                recommendations.append(f'Multiple unnecessary ports open: {port_list} - security risk')
         
         # Determine risk level
         if score >= 80:
@@ -214,11 +480,17 @@ class VulnerabilityScanner:
             'recommendations': recommendations
         }
 
-    def scan_url(self, url):
-        """Main scanning function"""
+    def scan_url(self, url, deep=False):
+        """Main scanning function (nmap only runs when deep is set)"""
         parsed_url = urlparse(url)
         hostname = parsed_url.hostname
         
+        try:
+            # Check the certificate on the port the headers are fetched from
+            ssl_port = (parsed_url.port if parsed_url.scheme == 'https' else None) or 443
+        except ValueError:
+            hostname = None
+        
         if not hostname:
             return {
                 'error': 'Invalid URL provided',
@@ -227,11 +499,55 @@ class VulnerabilityScanner:
         
         print(f"Starting vulnerability scan for: {url}", file=sys.stderr)
         
-        # Perform all scans
-        ssl_info = self.check_ssl_certificate(hostname)
-        headers_info = self.check_security_headers(url)
-        ports_info = self.scan_ports(hostname)
-        nmap_info = self.nmap_scan(hostname)
+        # Resolve once and share the address with every probe, preferring
+        # IPv4 since that is what most targets (and nmap by default) expect
+        try:
+            infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+            ip = next(
+                (info[4][0] for info in infos if info[0] == socket.AF_INET),
+                infos[0][4][0]
+            )
+        except (OSError, UnicodeError) as e:
+            return {
+                'error': f'Could not resolve hostname: {e}',
+                'url': url
+            }
+        
+        # The header fetch seeds the SSL cache for HTTPS URLs, so the
+        # certificate check runs right after it and skips its own handshake
+        def check_headers_and_ssl():
+            headers = self.check_security_headers(url)
+            return headers, self.check_ssl_certificate(hostname, ssl_port, ip=ip)
+        
+        # Run the independent probes concurrently
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            f_tls = executor.submit(check_headers_and_ssl)
+            f_ports = executor.submit(self.scan_ports, hostname, ip=ip)
+            nmap_procs = []
+            f_nmap = executor.submit(
+                self.nmap_scan, hostname, os_detection=deep, ip=ip,
+                on_start=nmap_procs.append
+            ) if deep else None
+            
+            headers_info, ssl_info = f_tls.result()
+            ports_info = f_ports.result()
+            if f_nmap is not None:
+                # Our probes already have the answer; give nmap a short grace period
+                try:
+                    nmap_info = f_nmap.result(timeout=self.NMAP_GRACE)
+                except concurrent.futures.TimeoutError:
+                    for proc in nmap_procs:
+                        proc.kill()
+                    nmap_info = {
+                        'available': False,
+                        'error': 'nmap too slow'
+                    }
+            else:
+                # scan_ports already covers the common ports
+                nmap_info = {
+                    'available': False,
+                    'skipped': True
+                }
         
         # Calculate risk assessment
         risk_assessment = self.calculate_risk_score(ssl_info, headers_info, ports_info)
@@ -250,23 +566,50 @@ class VulnerabilityScanner:
 
 def main():
     parser = argparse.ArgumentParser(description='Web Vulnerability Scanner')
-    parser.add_argument('url', help='Target URL to scan')
+    parser.add_argument('url', nargs='?', help='Target URL to scan')
+    parser.add_argument('--urls-file', help='File with one URL per line to scan in batch')
     parser.add_argument('--output', '-o', help='Output file (JSON format)')
+    parser.add_argument('--deep', action='store_true', help='Also run an nmap scan')
     
     args = parser.parse_args()
+    if bool(args.url) == bool(args.urls_file):
+        parser.error('provide either a URL or --urls-file')
     
+    # One scanner for every target so the session pool and SSL cache are shared
     scanner = VulnerabilityScanner()
-    results = scanner.scan_url(args.url)
+    try:
+        if args.urls_file:
+            with open(args.urls_file) as f:
+                urls = [line.strip() for line in f]
+            urls = [u for u in urls if u and not u.startswith('#')]
+            
+            def scan_one(url):
+                # Keep one result per line even if a single target blows up
+                try:
+                    return scanner.scan_url(url, deep=args.deep)
+                except Exception as e:
+                    return {
+                        'error': str(e),
+                        'url': url
+                    }
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(scan_one, urls))
+        else:
+            results = scanner.scan_url(args.url, deep=args.deep)
+    finally:
+        scanner.close()
     
     # Output results as JSON
-    json_output = json.dumps(results, indent=2, default=str)
+    payload = _dump_json(results)
     
     if args.output:
-        with open(args.output, 'w') as f:
-            f.write(json_output)
+        with open(args.output, 'wb') as f:
+            f.write(payload)
         print(f"Results saved to {args.output}", file=sys.stderr)
     else:
-        print(json_output)
+        sys.stdout.buffer.write(payload + b'\n')
+        sys.stdout.flush()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -10,7 +10,9 @@ interface PythonScanResult {
   ports: PortsInfo;
   nmap?: {
     available: boolean;
-    output?: string;
+    open_ports?: { port: number; protocol: string; service: string }[];
+    os?: string | null;
+    skipped?: boolean;
     error?: string;
   };
   overall_risk: string;